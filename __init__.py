@@ -20,12 +20,15 @@ from bpy.props import (
         FloatProperty,
         StringProperty,
         CollectionProperty,
+        PointerProperty,
         )
 from bpy_extras.io_utils import (
         ImportHelper,
         ExportHelper,
         )
 
+from . import lod_slt
+
 class ImportSLT(bpy.types.Operator, ImportHelper):
     """Import from SLT/SLB file format (.slt/.slb)"""
     bl_idname = "import_scene.slt"
@@ -35,6 +38,18 @@ class ImportSLT(bpy.types.Operator, ImportHelper):
     filename_ext = ".slt;*.slb"
     filter_glob: StringProperty(default="*.slt;*.slb", options={'HIDDEN'})
 
+    optimize_vertex_cache: BoolProperty(
+        name="Optimize Vertex Cache",
+        description="Reorder triangles and vertices of each object for GPU vertex cache locality, and report ACMR before and after",
+        default=False,
+        )
+
+    import_all_lods: BoolProperty(
+        name="Import All LODs",
+        description="Register every LOD level with its switch distance on each object. Only the first level is built at import, the others when selected",
+        default=False,
+        )
+
     def execute(self, context):
         from . import import_slt
         keywords = self.as_keywords(ignore=("axis_forward",
@@ -52,10 +67,18 @@ def menu_func_import_slt(self, context):
 
 # Register factories
 classes = (
-    
+    lod_slt.SLTLODMaterial,
+    lod_slt.SLTLODLevel,
+    lod_slt.SLTLODSet,
+    lod_slt.SLTUnloadLODs,
+    lod_slt.OBJECT_PT_slt_lod_set,
 )
 
 def register():
+    for cls in classes:
+        bpy.utils.register_class(cls)
+    bpy.types.Object.slt_lod_set = PointerProperty(type=lod_slt.SLTLODSet)
+
     bpy.utils.register_class(ImportSLT)
     bpy.types.TOPBAR_MT_file_import.append(menu_func_import_slt)
 
@@ -64,5 +87,9 @@ def unregister():
     bpy.types.TOPBAR_MT_file_import.remove(menu_func_import_slt)
     bpy.utils.unregister_class(ImportSLT)
 
+    del bpy.types.Object.slt_lod_set
+    for cls in reversed(classes):
+        bpy.utils.unregister_class(cls)
+
 if __name__ == "__main__":
     register()
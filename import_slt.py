@@ -1,11 +1,13 @@
 import bpy, bmesh, mathutils
 from bpy_extras.io_utils import axis_conversion
+import os
 import time
 import math
 import re
 
 from . import soultree_parser
 from . import soultree_classes as soultree
+from . import soultree_vcache
 
 ######################################################
 # IMPORT MAIN FILES
@@ -30,13 +32,10 @@ def new_object(name, parent):
     if parent is not None:
         ob.parent = parent
 
-    bm = bmesh.new()
-    bm.from_mesh(me)
-
     scn.collection.objects.link(ob)
     bpy.context.view_layer.objects.active = ob
 
-    return (ob, bm)
+    return ob
 
 
 def get_conversion_matrix():
@@ -72,13 +71,161 @@ def make_vertex_to_face_map(surface):
     return vertex_map
 
 
-def read_slt_file(file):
-    # parse and get parsed file
-    parser = soultree_parser.SoulTreeParser(file)
-    model = parser.read_and_get_model()
+# parsed models kept around for building LOD levels on demand, keyed by (filepath, file_stamp)
+model_cache = {}
+
+
+def get_file_stamp(filepath):
+    return str(os.stat(filepath).st_mtime_ns)
+
+
+def read_model(filepath):
+    mode = 'rb' if filepath.lower().endswith(".slb") else 'r'
+    with open(filepath, mode) as file:
+        parser = soultree_parser.SoulTreeParser(file)
+        return parser.read_and_get_model()
+
+
+def get_model(filepath, file_stamp):
+    """ Gets the model cached by an import, reading it again if it was released"""
+    key = (filepath, file_stamp)
+    if key not in model_cache:
+        if get_file_stamp(filepath) != file_stamp:
+            raise ValueError("{} has changed since it was imported".format(filepath))
+        model_cache[key] = read_model(filepath)
+    return model_cache[key]
+
+
+def release_models():
+    model_cache.clear()
+
+
+def build_object_mesh(me, model, lod_num, ob_num, blender_materials, optimize_vertex_cache):
+    """ Fills a mesh with the geometry of one object in one lod, returns (misses_before, misses_after, faces)"""
+    lod = model.get_lod(lod_num)
+    bm = bmesh.new()
+
+    # create layers for this object
+    uv_layer = bm.loops.layers.uv.new()
+    vc_layer = bm.loops.layers.color.new()
+
+    # add materials
+    material_index_map = {}
+    for surface in lod.surfaces:
+        vertex_range_start, vertex_range_count = surface.object_pointer_list.get_vertex_range(ob_num)
+        if vertex_range_count > 0:
+            for index in surface.material_indices:
+                if index not in material_index_map:
+                    material_index_map[index] = len(me.materials)
+                    me.materials.append(blender_materials[index])
+
+    # fill it with data
+    vertex_base = 0
+    surf_material_number = 0
+    misses_before = 0
+    misses_after = 0
+    total_faces = 0
+
+    for surface in lod.surfaces:
+        vertex_range_start, vertex_range_count = surface.object_pointer_list.get_vertex_range(ob_num)
+        vertex_range_end = vertex_range_start + vertex_range_count
+
+        # gather faces, keeping the FaceList order
+        face_set = set()
+        vertex_map = {}  # index to BM
+        v2f_map = make_vertex_to_face_map(surface)
+
+        for vertnum in range(vertex_range_start, vertex_range_end):
+            face_set.update(v2f_map.get(vertnum, ()))
+
+        faces = [x for x in dict.fromkeys(surface.face_list.faces) if x in face_set]
+        vertnums = range(vertex_range_start, vertex_range_end)
+
+        if optimize_vertex_cache and len(faces) > 0:
+            misses_before += soultree_vcache.count_cache_misses(faces)
+            faces = soultree_vcache.optimize_faces(faces)
+            misses_after += soultree_vcache.count_cache_misses(faces)
+            total_faces += len(faces)
+
+            # order vertices by first use, unused ones go last
+            vertnums = dict.fromkeys(x for face in faces for x in face if vertex_range_start <= x < vertex_range_end)
+            vertnums.update(dict.fromkeys(range(vertex_range_start, vertex_range_end)))
+
+        # create verts
+        for vertnum in vertnums:
+            adjusted_vertnum = vertnum + vertex_base
+            if adjusted_vertnum not in vertex_map:
+                vert = surface.vertex_list.vertices[vertnum].co
+
+                vert = slt_vertex_to_blender(vert)
+                bmvert = bm.verts.new(vert)
+                vertex_map[vertnum] = bmvert
+
+        # create faces
+        for face_indices in faces:
+            # create face
+            try:
+                bmverts = [vertex_map[x] for x in face_indices]
+                verts = [surface.vertex_list.vertices[x] for x in face_indices]
+
+                face = bm.faces.new(bmverts)
+                face.material_index = material_index_map[surf_material_number]
+                face.smooth = True
+
+                for x in range(3):
+                    face.loops[x][uv_layer].uv = (verts[x].uv[0], 1 - verts[x].uv[1])
+                    face.loops[x][vc_layer] = verts[x].color
+
+            except Exception as e:
+                print(str(e))
+
+        # --
+        vertex_base += vertex_range_count
+        surf_material_number += 1
+
+    if total_faces > 0:
+        print(" vertex cache for %r: ACMR %.3f -> %.3f" % (me.name,
+                                                          misses_before / total_faces,
+                                                          misses_after / total_faces))
+
+    # calculate normals
+    bm.normal_update()
+
+    # free resources
+    bm.to_mesh(me)
+    bm.free()
+
+    return (misses_before, misses_after, total_faces)
+
+
+def build_lod_mesh(ob, lod_num):
+    """ Builds the mesh for a lod level of an object imported with all lods"""
+    lod_set = ob.slt_lod_set
+    model = get_model(lod_set.filepath, lod_set.file_stamp)
+
+    if (len(model.lods) != len(lod_set.levels)
+            or len(model.object_hierarchy.objects) != lod_set.object_count
+            or len(model.materials) != len(lod_set.materials)):
+        raise ValueError("{} no longer matches the imported LOD set".format(lod_set.filepath))
+
+    blender_materials = [x.material for x in lod_set.materials]
+
+    me = bpy.data.meshes.new("{}_LOD{}Mesh".format(ob.name, lod_num))
+    try:
+        build_object_mesh(me, model, lod_num, lod_set.object_index, blender_materials, lod_set.optimize_vertex_cache)
+    except Exception:
+        bpy.data.meshes.remove(me)
+        raise
+
+    return me
 
-    # import first lod
-    lod = model.get_lod(0)
+
+def read_slt_file(filepath, optimize_vertex_cache, import_all_lods):
+    # parse and get parsed file, keep it if other lods get built later
+    file_stamp = get_file_stamp(filepath)
+    model = read_model(filepath)
+    if import_all_lods:
+        model_cache[(filepath, file_stamp)] = model
 
     # to import soultree
     # - for each object
@@ -90,6 +237,11 @@ def read_slt_file(file):
     blender_objects = [None]*object_count
     blender_materials = [None]*material_count
 
+    # vertex cache totals for the whole file
+    misses_before = 0
+    misses_after = 0
+    total_faces = 0
+
     for mat_num in range(material_count):
         blender_materials[mat_num] = new_material("Material#" + str(mat_num))
 
@@ -102,7 +254,7 @@ def read_slt_file(file):
             parent_idx = model.object_hierarchy.objects.index(ob_data.parent)
 
         # create object
-        ob, bm = new_object(ob_data.name, None if parent_idx < 0 else blender_objects[parent_idx])
+        ob = new_object(ob_data.name, None if parent_idx < 0 else blender_objects[parent_idx])
         blender_objects[ob_num] = ob
 
         mtx = mathutils.Matrix()
@@ -115,100 +267,71 @@ def read_slt_file(file):
         # ob.matrix_local = mtx @ get_conversion_matrix()
         ob.location = slt_vertex_to_blender((ob_data.matrix[9], ob_data.matrix[10], ob_data.matrix[11]))
 
-        # create layers for this object
-        uv_layer = bm.loops.layers.uv.new()
-        vc_layer = bm.loops.layers.color.new()
-
-        # add materials
-        material_index_map = {}
-        for surface in lod.surfaces:
-            vertex_range_start, vertex_range_count = surface.object_pointer_list.get_vertex_range(ob_num)
-            if vertex_range_count > 0:
-                for index in surface.material_indices:
-                    if index not in material_index_map:
-                        material_index_map[index] = len(ob.data.materials)
-                        ob.data.materials.append(blender_materials[index])
-
-        # fill it with data
-        vertex_base = 0
-        surf_material_number = 0
-
-        for surface in lod.surfaces:
-            vertex_range_start, vertex_range_count = surface.object_pointer_list.get_vertex_range(ob_num)
-            vertex_range_end = vertex_range_start + vertex_range_count
-
-            # create verts and gather faces
-            faces = set()
-            vertex_map = {}  # index to BM
-            v2f_map = make_vertex_to_face_map(surface)
-
-            for vertnum in range(vertex_range_start, vertex_range_end):
-                adjusted_vertnum = vertnum + vertex_base
-                if adjusted_vertnum not in vertex_map:
-                    vert = surface.vertex_list.vertices[vertnum].co
-                    faces.update(v2f_map[vertnum])
-
-                    vert = slt_vertex_to_blender(vert)
-                    bmvert = bm.verts.new(vert)
-                    vertex_map[vertnum] = bmvert
-
-            # create faces
-            for face_indices in faces:
-                # create face
-                try:
-                    bmverts = [vertex_map[x] for x in face_indices]
-                    verts = [surface.vertex_list.vertices[x] for x in face_indices]
-
-                    face = bm.faces.new(bmverts)
-                    face.material_index = material_index_map[surf_material_number]
-                    face.smooth = True
-
-                    for x in range(3):
-                        face.loops[x][uv_layer].uv = (verts[x].uv[0], 1 - verts[x].uv[1])
-                        face.loops[x][vc_layer] = verts[x].color
-
-                except Exception as e:
-                    print(str(e))
-
-            # --
-            vertex_base += vertex_range_count
-            surf_material_number += 1
-
-        # calculate normals
-        bm.normal_update()
-
-        # free resources
-        bm.to_mesh(ob.data)
-        bm.free()
+        # build the first lod, others are built when selected
+        ob_misses_before, ob_misses_after, ob_faces = build_object_mesh(ob.data, model, 0, ob_num,
+                                                                        blender_materials, optimize_vertex_cache)
+        misses_before += ob_misses_before
+        misses_after += ob_misses_after
+        total_faces += ob_faces
+
+        if import_all_lods:
+            lod_set = ob.slt_lod_set
+            lod_set.filepath = filepath
+            lod_set.file_stamp = file_stamp
+            lod_set.object_index = ob_num
+            lod_set.object_count = object_count
+            lod_set.optimize_vertex_cache = optimize_vertex_cache
+
+            for mtl in blender_materials:
+                lod_set.materials.add().material = mtl
+
+            for lod_num in range(len(model.lods)):
+                level = lod_set.levels.add()
+                level.distance = model.get_lod_distance(lod_num)
+
+            lod_set.levels[0].mesh = ob.data
+
+    return (misses_before, misses_after, total_faces)
 
 
 ######################################################
 # IMPORT
 ######################################################
 def load_slt(filepath,
-             context):
+             context,
+             optimize_vertex_cache=False,
+             import_all_lods=False):
 
     print("importing SoulTree: %r..." % (filepath))
 
     time1 = time.perf_counter()
 
-    mode = 'rb' if filepath.lower().endswith(".slb") else 'r'
-    file = open(filepath, mode)
-
     # start reading our slt file
-    read_slt_file(file)
+    misses_before, misses_after, total_faces = read_slt_file(filepath, optimize_vertex_cache, import_all_lods)
 
     print(" done in %.4f sec." % (time.perf_counter() - time1))
-    file.close()
+
+    if total_faces > 0:
+        return "Vertex cache ACMR %.3f -> %.3f over %d faces" % (misses_before / total_faces,
+                                                                 misses_after / total_faces,
+                                                                 total_faces)
+    return None
 
 
 def load(operator,
          context,
          filepath="",
+         optimize_vertex_cache=False,
+         import_all_lods=False,
          ):
 
-    load_slt(filepath,
-             context,
-             )
+    acmr_report = load_slt(filepath,
+                           context,
+                           optimize_vertex_cache=optimize_vertex_cache,
+                           import_all_lods=import_all_lods,
+                           )
+
+    if acmr_report is not None:
+        operator.report({'INFO'}, acmr_report)
 
     return {'FINISHED'}
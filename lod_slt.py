@@ -0,0 +1,150 @@
+import bpy
+
+from bpy.props import (
+        BoolProperty,
+        CollectionProperty,
+        FloatProperty,
+        IntProperty,
+        PointerProperty,
+        StringProperty,
+        )
+
+######################################################
+# LOD SET DATA
+######################################################
+def report_build_error(context, message):
+    def draw(self, context):
+        self.layout.label(text=message)
+
+    print("SoulTree LOD build failed: %s" % (message))
+    context.window_manager.popup_menu(draw, title="Can't Build LOD", icon='ERROR')
+
+
+def restore_shown_level(lod_set):
+    """ Points active_level back at the level whose mesh the object shows"""
+    ob = lod_set.id_data
+    for level_num, level in enumerate(lod_set.levels):
+        if level.mesh == ob.data:
+            lod_set.active_level = level_num
+            break
+
+
+def active_level_update(self, context):
+    """ Swaps in the mesh of the active level, building it the first time"""
+    from . import import_slt
+
+    # objects not imported with all lods have nothing to switch
+    if len(self.levels) == 0:
+        return
+
+    # clamping sets the property again, which runs this update with a valid level
+    last_level = max(len(self.levels) - 1, 0)
+    if self.active_level > last_level:
+        self.active_level = last_level
+        return
+
+    ob = self.id_data
+    level = self.levels[self.active_level]
+    if level.mesh is None:
+        try:
+            level.mesh = import_slt.build_lod_mesh(ob, self.active_level)
+        except OSError:
+            report_build_error(context, "Source file not found: {}".format(self.filepath))
+            restore_shown_level(self)
+            return
+        except Exception as e:
+            # changed or corrupt source file
+            report_build_error(context, str(e))
+            restore_shown_level(self)
+            return
+
+    ob.data = level.mesh
+
+
+class SLTLODMaterial(bpy.types.PropertyGroup):
+    material: PointerProperty(type=bpy.types.Material)
+
+
+class SLTLODLevel(bpy.types.PropertyGroup):
+    distance: FloatProperty(name="Distance", description="Distance this level is switched to at")
+    mesh: PointerProperty(type=bpy.types.Mesh)
+
+
+class SLTLODSet(bpy.types.PropertyGroup):
+    filepath: StringProperty(subtype='FILE_PATH')
+    file_stamp: StringProperty()  # source modification time at import
+    object_index: IntProperty()
+    object_count: IntProperty()
+    optimize_vertex_cache: BoolProperty()
+    materials: CollectionProperty(type=SLTLODMaterial)
+    levels: CollectionProperty(type=SLTLODLevel)
+    active_level: IntProperty(name="Active LOD", min=0, update=active_level_update)
+
+
+######################################################
+# OPERATORS
+######################################################
+def get_lod_set_objects(context):
+    return [ob for ob in context.selected_objects if len(ob.slt_lod_set.levels) > 0]
+
+
+class SLTUnloadLODs(bpy.types.Operator):
+    """Free the meshes of inactive LOD levels on selected SoulTree objects"""
+    bl_idname = "object.slt_unload_lods"
+    bl_label = 'Unload Inactive LODs'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        return len(get_lod_set_objects(context)) > 0
+
+    def execute(self, context):
+        from . import import_slt
+
+        freed = 0
+        for ob in get_lod_set_objects(context):
+            lod_set = ob.slt_lod_set
+            for level in lod_set.levels:
+                if level.mesh is None or level.mesh == ob.data:
+                    continue
+
+                me = level.mesh
+                level.mesh = None
+                if me.users == 0:
+                    bpy.data.meshes.remove(me)
+                    freed += 1
+
+        # parsed files are read again if a level is needed later
+        import_slt.release_models()
+
+        self.report({'INFO'}, "Unloaded {} LOD meshes".format(freed))
+        return {'FINISHED'}
+
+
+######################################################
+# UI
+######################################################
+class OBJECT_PT_slt_lod_set(bpy.types.Panel):
+    bl_label = "SoulTree LOD"
+    bl_space_type = 'PROPERTIES'
+    bl_region_type = 'WINDOW'
+    bl_context = "object"
+
+    @classmethod
+    def poll(cls, context):
+        return context.object is not None and len(context.object.slt_lod_set.levels) > 0
+
+    def draw(self, context):
+        layout = self.layout
+        lod_set = context.object.slt_lod_set
+
+        layout.prop(lod_set, "active_level")
+
+        col = layout.column(align=True)
+        for level_num, level in enumerate(lod_set.levels):
+            row = col.row()
+            row.label(text="LOD {}".format(level_num))
+            row.label(text="{:.2f}".format(level.distance))
+            row.label(text="Loaded" if level.mesh is not None else "Not Loaded")
+
+        layout.operator(SLTUnloadLODs.bl_idname)
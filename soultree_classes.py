@@ -277,12 +277,18 @@ class Material:
 class SoulTreeModel:
     def __init__(self):
         self.lods = []
+        self.lod_distances = []  # switch distance for each lod after the first
         self.materials = []
         self.object_hierarchy = ObjectHierarchy()
 
     def get_lod(self, lodid):
         return self.lods[lodid]
 
+    def get_lod_distance(self, lodid):
+        if lodid == 0 or lodid > len(self.lod_distances):
+            return 0.0
+        return self.lod_distances[lodid - 1]
+
     def get_surface(self, lodid, surfid):
         return self.get_lod(lodid).surfaces[surfid]
 
@@ -302,7 +308,8 @@ class SoulTreeModel:
         lod_count = struct.unpack("<L", file.read(4))[0]
         auto_lod = struct.unpack("<L", file.read(4))[0] != 0
         if auto_lod:
-            file.seek(4 * (lod_count - 1), 1)
+            distance_count = lod_count - 1
+            self.lod_distances = list(struct.unpack("<{}f".format(distance_count), file.read(distance_count * 4)))
 
         self.lods = [LOD() for x in range(lod_count)]
         for x in range(lod_count):
@@ -0,0 +1,107 @@
+import collections
+
+# Forsyth "Linear-Speed Vertex Cache Optimisation" tuning values
+CACHE_SIZE = 32
+CACHE_DECAY_POWER = 1.5
+LAST_TRI_SCORE = 0.75
+VALENCE_BOOST_SCALE = 2.0
+VALENCE_BOOST_POWER = 0.5
+
+# FIFO cache size used when measuring ACMR, a typical post-transform cache
+ACMR_CACHE_SIZE = 16
+
+
+def vertex_score(cache_position, remaining_valence):
+    """ Scores a vertex by its position in the simulated cache and how many unadded faces still use it"""
+    if remaining_valence <= 0:
+        return -1.0
+
+    score = 0.0
+    if cache_position >= 0:
+        if cache_position < 3:
+            # vertices of the last face get a fixed score so they aren't favoured too much
+            score = LAST_TRI_SCORE
+        else:
+            scaler = 1.0 / (CACHE_SIZE - 3)
+            score = (1.0 - (cache_position - 3) * scaler) ** CACHE_DECAY_POWER
+
+    # boost vertices with few faces left, so lone faces get cleared out
+    score += VALENCE_BOOST_SCALE * (remaining_valence ** -VALENCE_BOOST_POWER)
+    return score
+
+
+def optimize_faces(faces):
+    """ Reorders a list of (i0, i1, i2) faces for vertex cache locality, returns the new list"""
+    face_count = len(faces)
+    if face_count == 0:
+        return []
+
+    vertex_faces = {}
+    for face_num, face in enumerate(faces):
+        for index in face:
+            if index not in vertex_faces:
+                vertex_faces[index] = []
+            vertex_faces[index].append(face_num)
+
+    scores = {index: vertex_score(-1, len(face_nums)) for index, face_nums in vertex_faces.items()}
+    face_added = [False] * face_count
+
+    # pick the best scoring face to start with
+    best_face = max(range(face_count), key=lambda x: sum(scores[i] for i in faces[x]))
+    scan_pos = 0
+
+    cache = []
+    result = []
+
+    while len(result) < face_count:
+        if best_face < 0:
+            # nothing useful left in the cache, continue from the next unadded face
+            while face_added[scan_pos]:
+                scan_pos += 1
+            best_face = scan_pos
+
+        face = faces[best_face]
+        face_added[best_face] = True
+        result.append(face)
+
+        for index in face:
+            vertex_faces[index].remove(best_face)
+
+        # move this face's vertices to the front of the cache
+        new_cache = list(dict.fromkeys(face))
+        new_cache.extend(index for index in cache if index not in face)
+
+        for index in new_cache[CACHE_SIZE:]:
+            scores[index] = vertex_score(-1, len(vertex_faces[index]))
+        cache = new_cache[:CACHE_SIZE]
+
+        # rescore cached vertices, and find the best face using them
+        candidate_faces = set()
+        for position, index in enumerate(cache):
+            scores[index] = vertex_score(position, len(vertex_faces[index]))
+            candidate_faces.update(vertex_faces[index])
+
+        best_face = -1
+        best_score = -1.0
+        for face_num in candidate_faces:
+            score = sum(scores[i] for i in faces[face_num])
+            if score > best_score:
+                best_face = face_num
+                best_score = score
+
+    return result
+
+
+def count_cache_misses(faces, cache_size=ACMR_CACHE_SIZE):
+    """ Counts vertex cache misses drawing faces through a FIFO cache"""
+    cache = collections.deque(maxlen=cache_size)
+    misses = 0
+
+    for face in faces:
+        for index in face:
+            if index not in cache:
+                cache.append(index)
+                misses += 1
+
+    return misses
+